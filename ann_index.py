@@ -0,0 +1,109 @@
+#! /usr/bin/env python
+
+import argparse
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from vector_store import STORE_PATH, VectorStore
+
+""" Approximate nearest-neighbour index (IVF).
+    The normalized vectors are clustered offline with spherical k-means. A query only scores the
+    words in its nprobe closest clusters, exactly, against the full-precision matrix, so the whole
+    GoogleNews vocabulary (`python vector_store.py --limit 0`) can be searched interactively.
+    nprobe is the recall/latency knob: more clusters probed, better recall, slower guesses. The value
+    given at build time is stored as the default; set CATCHPHRASE_NPROBE (or pass --nprobe to the server
+    or self-play) to try another one without rebuilding.
+
+    python ann_index.py [--lists N] [--nprobe 16]
+"""
+
+ANN_PATH = STORE_PATH + '.ivf.npz'
+NPROBE = 16
+LOAD_NPROBE = int(os.environ.get('CATCHPHRASE_NPROBE', '') or 0)  # 0 keeps the index's own
+
+
+class IVFIndex:
+    """Inverted lists of row ids, one per k-means centroid"""
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, nprobe: int = NPROBE) -> None:
+        self.centroids = centroids
+        self.order = order  # row ids grouped by cluster
+        self.offsets = offsets  # cluster c owns order[offsets[c]:offsets[c + 1]]
+        self.nprobe = nprobe
+
+    @property
+    def size(self) -> int:
+        return len(self.order)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, lists: int = 0, iterations: int = 10, nprobe: int = NPROBE,
+              seed: int = 0, chunk: int = 65536) -> 'IVFIndex':
+        """Spherical k-means on a sample of the rows, then every row goes to its nearest centroid"""
+        rng = np.random.default_rng(seed)
+        lists = lists or max(1, int(np.sqrt(len(vectors))))
+        sample_rows = np.sort(rng.choice(len(vectors), size=min(len(vectors), 64 * lists), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=lists) == 0
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        assignment = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            assignment[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable').astype(np.int32)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=lists)))).astype(np.int64)
+        return cls(centroids.astype(np.float32), order, offsets, nprobe)
+
+    @classmethod
+    def load(cls, path: str = ANN_PATH) -> 'IVFIndex':
+        with np.load(path) as data:
+            return cls(data['centroids'], data['order'], data['offsets'], int(data['nprobe']))
+
+    def save(self, path: str = ANN_PATH) -> None:
+        with open(path, 'wb') as file:
+            np.savez(file, centroids=self.centroids, order=self.order, offsets=self.offsets, nprobe=self.nprobe)
+
+    def probe(self, query: np.ndarray, nprobe: int = 0) -> np.ndarray:
+        """Row ids of every word in the clusters closest to the query, in ascending order for locality"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in closest])
+        rows.sort()
+        return rows
+
+
+def load_ann_index(store: VectorStore, path: str = ANN_PATH, nprobe: int = LOAD_NPROBE) -> Optional[IVFIndex]:
+    """The index built for this store, or None (exact search) if there isn't one.
+    A non-zero nprobe replaces the one stored with the index."""
+    if not os.path.exists(path):
+        return None
+    index = IVFIndex.load(path)
+    if index.size != len(store.index2word):
+        raise ValueError(f'{path} indexes {index.size} words but the vector store has {len(store.index2word)}')
+    if nprobe:
+        index.nprobe = nprobe
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the IVF index for the converted vector store.')
+    parser.add_argument('--store', default=STORE_PATH, help='path prefix of the converted store')
+    parser.add_argument('--output', default=ANN_PATH)
+    parser.add_argument('--lists', type=int, default=0, help='number of clusters (default sqrt of the vocabulary)')
+    parser.add_argument('--iterations', type=int, default=10, help='k-means iterations')
+    parser.add_argument('--nprobe', type=int, default=NPROBE, help='default clusters searched per guess')
+    args = parser.parse_args()
+
+    store = VectorStore.load(args.store)
+    start = time.time()
+    ivf_index = IVFIndex.build(store.vectors, args.lists, args.iterations, args.nprobe)
+    ivf_index.save(args.output)
+    print(f'Indexed {ivf_index.size} words into {len(ivf_index.centroids)} clusters in {time.time() - start:.1f}s')
@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import wave
+from typing import Dict, NamedTuple
+
+from tracing import tracer
+
+""" Sound effects.
+    The WAVs in sound/ are decoded into memory once at startup and played by a background worker,
+    so a point or skip never stalls the game. Playback uses simpleaudio when it is installed (straight
+    from the decoded frames) and falls back to playsound. Set CATCHPHRASE_SOUND=off for a silent
+    backend, e.g. on headless servers and in tests.
+"""
+
+SOUND_DIR = 'sound'
+SOUNDS = ('point', 'skip', 'game_over')
+SOUND_BACKEND = os.environ.get('CATCHPHRASE_SOUND', '')
+
+
+class Clip(NamedTuple):
+    """A decoded WAV file"""
+    path: str
+    frames: bytes
+    channels: int
+    sample_width: int
+    rate: int
+
+
+def load_clip(path: str) -> Clip:
+    with wave.open(path, 'rb') as file:
+        return Clip(path, file.readframes(file.getnframes()), file.getnchannels(), file.getsampwidth(),
+                    file.getframerate())
+
+
+class NullBackend:
+    """Plays nothing"""
+
+    def play(self, clip: Clip) -> None:
+        pass
+
+
+class SimpleAudioBackend:
+    """Plays the decoded frames directly, without touching the disk"""
+
+    def __init__(self) -> None:
+        import simpleaudio
+        self.simpleaudio = simpleaudio
+
+    def play(self, clip: Clip) -> None:
+        self.simpleaudio.play_buffer(clip.frames, clip.channels, clip.sample_width, clip.rate).wait_done()
+
+
+class PlaysoundBackend:
+    """playsound only takes a file name, so this one still reads the file for every play"""
+
+    def __init__(self) -> None:
+        from playsound import playsound
+        self.playsound = playsound
+
+    def play(self, clip: Clip) -> None:
+        self.playsound(clip.path)
+
+
+def make_backend(name: str = SOUND_BACKEND):
+    """The named backend ('off', 'simpleaudio' or 'playsound'), or the best one installed if no name is given"""
+    if name == 'off':
+        return NullBackend()
+    if name == 'simpleaudio':
+        return SimpleAudioBackend()
+    if name == 'playsound':
+        return PlaysoundBackend()
+    if name:
+        raise ValueError(f'Unknown sound backend {name!r}')
+    for backend in (SimpleAudioBackend, PlaysoundBackend):
+        try:
+            return backend()
+        except ImportError:
+            pass
+    return NullBackend()
+
+
+class SoundPlayer(threading.Thread):
+    """Plays the preloaded clips in order on its own thread. play() only queues the clip."""
+
+    def __init__(self, backend=None, sound_dir: str = SOUND_DIR, depth: int = 4) -> None:
+        super(SoundPlayer, self).__init__()
+        self.backend = backend or make_backend()
+        self.clips: Dict[str, Clip] = {}
+        if not isinstance(self.backend, NullBackend):
+            self.clips = {name: load_clip(os.path.join(sound_dir, f'{name}.wav')) for name in SOUNDS}
+        self.pending: queue.Queue = queue.Queue(maxsize=depth)
+        self.dropped = 0
+        self.name = 'sound'
+        self.daemon = True
+        self.start()
+
+    def play(self, name: str) -> None:
+        """Queues a sound by name ('point', 'skip' or 'game_over'). Never blocks: if playback is backed up, it is dropped."""
+        try:
+            self.pending.put_nowait(name)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        while True:
+            name = self.pending.get()
+            clip = self.clips.get(name)
+            if clip is not None:
+                with tracer.span('sound'):
+                    try:
+                        self.backend.play(clip)
+                    except Exception:  # A missing or busy audio device shouldn't take the game down
+                        pass
+            self.pending.task_done()
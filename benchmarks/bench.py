@@ -0,0 +1,209 @@
+#! /usr/bin/env python
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import cycle, islice
+from typing import Callable, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from ann_index import IVFIndex  # noqa: E402
+from clue_fetcher import ClueFetcher  # noqa: E402
+from clue_store import ClueStore, filter_definitions  # noqa: E402
+from game_engine import GameResources  # noqa: E402
+from guess_engine import GuessEngine  # noqa: E402
+from linguistics import bad_clue, parse_clue, use_rhyme_index  # noqa: E402
+from rhyme_index import RhymeIndex  # noqa: E402
+from vector_store import VectorStore  # noqa: E402
+
+""" Benchmarks for the game's hot paths.
+    Runs without the GoogleNews vectors or the network: the embedding is a seeded synthetic matrix
+    over the deck, the stopwords, the words of a recorded BabelNet page and filler tokens, and the
+    BabelNet page is served from benchmarks/fixtures by a local stub server.
+
+    python benchmarks/bench.py --output before.json
+    python benchmarks/bench.py --output after.json --compare before.json
+"""
+
+FIXTURE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'babelnet_apple.html')
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds and throughput in operations per second"""
+    latencies = np.array(samples) * 1000
+    return {
+        'runs': len(samples),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'ops_per_s': float(len(samples) / max(sum(samples), 1e-12)),
+    }
+
+
+def measure(operation: Callable[[], object], repeat: int, warmup: int = 3) -> Dict[str, float]:
+    for _ in range(warmup):
+        operation()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def synthetic_store(words: List[str], size: int, dim: int, seed: int) -> VectorStore:
+    """Seeded random unit vectors over the given words, padded with filler tokens up to size rows"""
+    index2word = list(dict.fromkeys(words))
+    index2word += [f'filler{i}' for i in range(max(0, size - len(index2word)))]
+    vectors = np.random.default_rng(seed).standard_normal((len(index2word), dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return VectorStore(index2word, vectors)
+
+
+def stub_server(page: bytes) -> ThreadingHTTPServer:
+    """Serves the recorded page for every request, standing in for babelnet.org"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(args.seed)
+    with open("data/catchphrase_words.txt", encoding='utf8') as file:
+        deck = [w.strip() for w in file]
+    with open("data/stopwords.txt", encoding='utf8') as file:
+        stopwords = {w.strip() for w in file}
+    with open(FIXTURE, 'rb') as file:
+        page = file.read()
+    fetcher = ClueFetcher()
+    definitions = fetcher.parse(page)
+    page_words = sorted({w for d in definitions for w in d.lower().split()})
+    results: Dict[str, Dict[str, float]] = {}
+    workdir = tempfile.mkdtemp(prefix='catchphrase-bench-')
+
+    # Built from cmudict into the bench's own directory, so neither the build nor data/rhymes.json is timed
+    rhymes = RhymeIndex.build()
+    rhymes_path = os.path.join(workdir, 'rhymes.json')
+    rhymes.save(rhymes_path)
+    use_rhyme_index(rhymes)
+    results['rhyme_index_load'] = measure(lambda: RhymeIndex.load(rhymes_path), max(3, args.repeat // 20), warmup=1)
+
+    store = synthetic_store(deck + sorted(stopwords) + page_words + ['Apple', 'APPLE', 'New_York'],
+                            args.vocab_size, args.dim, args.seed)
+    store_path = os.path.join(workdir, 'vectors')
+    store.save(store_path)
+    results['model_load'] = measure(lambda: VectorStore.load(store_path), max(3, args.repeat // 20), warmup=1)
+    store = VectorStore.load(store_path)
+    results['guess_engine_init'] = measure(lambda: GuessEngine(store), 3, warmup=0)
+
+    resources = GameResources(store, ClueStore(os.path.join(workdir, 'clues.sqlite3')), stopwords, deck)
+    clue_sets = [rng.sample(deck, rng.randint(1, 4)) for _ in range(args.repeat)]
+    guessed_sets = [rng.sample(deck, rng.randint(0, 8)) for _ in range(args.repeat)]
+
+    next_clue, next_guessed = partial(next, cycle(clue_sets)), partial(next, cycle(guessed_sets))
+    results['guesser_top50'] = measure(
+        lambda: list(islice(resources.guess_engine.candidates(next_clue(), next_guessed()), 50)), args.repeat)
+    results['generate_guess'] = measure(lambda: resources.generate_guess(next_clue(), next_guessed()), args.repeat)
+
+    start = time.perf_counter()
+    ivf_index = IVFIndex.build(store.vectors, nprobe=args.nprobe)
+    results['ann_build'] = summarize([time.perf_counter() - start])
+    ann_engine = GuessEngine(store, index=ivf_index)
+    results['guesser_top50_ann'] = measure(
+        lambda: list(islice(ann_engine.candidates(next_clue(), next_guessed()), 50)), args.repeat)
+    recalls = []
+    for clue, guessed in zip(clue_sets, guessed_sets):
+        exact = set(islice(resources.guess_engine.candidates(clue, guessed), 50))
+        recalls.append(len(exact & set(islice(ann_engine.candidates(clue, guessed), 50))) / max(len(exact), 1))
+    results['guesser_top50_ann']['recall_at_50'] = float(np.mean(recalls))
+
+    for kind in ('float16', 'int8'):
+        quantized_store = VectorStore(store.index2word, store.vectors)
+        quantized_store.quantize(kind)
+        quantized_engine = GuessEngine(quantized_store)
+        results[f'guesser_top50_{kind}'] = measure(
+            lambda: list(islice(quantized_engine.candidates(next_clue(), next_guessed()), 50)), args.repeat)
+        name = f'generate_guess_{kind}'
+        results[name] = measure(lambda: quantized_engine.best_guess(next_clue(), next_guessed()), args.repeat)
+        # The guess the player actually sees, compared with the float32 engine's
+        agreement = [quantized_engine.best_guess(clue, guessed) == resources.guess_engine.best_guess(clue, guessed)
+                     for clue, guessed in zip(clue_sets, guessed_sets)]
+        results[name]['guess_agreement'] = float(np.mean(agreement))
+
+    targets = partial(next, cycle(deck))
+    results['bad_clue'] = measure(lambda: bad_clue(targets(), next_clue()), args.repeat)
+    clue_texts = partial(next, cycle([d.lower() for d in definitions]))
+    results['clue_parser'] = measure(lambda: parse_clue(clue_texts(), store.vocab, stopwords), args.repeat)
+    results['clue_html_parse'] = measure(lambda: fetcher.parse(page), args.repeat)
+    results['clue_filter'] = measure(
+        lambda: filter_definitions('apple', definitions, store.vocab, stopwords), args.repeat)
+
+    server = stub_server(page)
+    stub_fetcher = ClueFetcher(f'http://127.0.0.1:{server.server_address[1]}')
+    results['clue_fetch_stub'] = measure(partial(stub_fetcher.fetch, 'apple'), max(10, args.repeat // 5))
+    server.shutdown()
+    resources.clue_store.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_results(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]] = None) -> None:
+    header = f'{"operation":<20} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10} {"ops/s":>12}'
+    print(header + ('   p50 vs baseline' if baseline else ''))
+    for name, stats in results.items():
+        line = (f'{name:<20} {stats["p50_ms"]:>10.3f} {stats["p95_ms"]:>10.3f} {stats["p99_ms"]:>10.3f} '
+                f'{stats["ops_per_s"]:>12.1f}')
+        if baseline and name in baseline and baseline[name]['p50_ms']:
+            line += f'   {stats["p50_ms"] / baseline[name]["p50_ms"]:.2f}x'
+        if 'recall_at_50' in stats:
+            line += f'   recall@50 {stats["recall_at_50"]:.3f}'
+        if 'guess_agreement' in stats:
+            line += f'   same guess {stats["guess_agreement"]:.3f}'
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the guess, filter, parse and startup hot paths.')
+    parser.add_argument('--vocab-size', type=int, default=200000, help='rows in the synthetic embedding')
+    parser.add_argument('--dim', type=int, default=300, help='dimensions of the synthetic embedding')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=200, help='timed runs per operation')
+    parser.add_argument('--nprobe', type=int, default=16, help='IVF clusters probed by the ANN guesser')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf8') as file:
+            baseline = json.load(file)['results']
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as file:
+            json.dump({'config': vars(args), 'time': time.time(), 'results': results}, file, indent=2)
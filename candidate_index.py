@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+
+import argparse
+import os
+import time
+from typing import Container, Optional
+
+import numpy as np
+
+from vector_store import QUANTIZATIONS, STORE_PATH, VectorStore, remove_quantized
+
+""" Candidate sub-index.
+    Most of the GoogleNews vocabulary can never be a guess: proper nouns and casing variants,
+    phrases joined with underscores, numbers, misspellings and stopwords. `python candidate_index.py`
+    keeps the rows of lowercase, purely alphabetic, non-stopword words (optionally only the N most
+    frequent, or only some parts of speech) plus every deck word, and copies them into one contiguous
+    matrix, data/vectors.candidates.npy, with their vocabulary rows in data/vectors.candidates.rows.npy.
+    The guesser then scans only that matrix, and its top k is made of playable words. When the store has
+    a quantized copy, the same rows of it are kept too (data/vectors.candidates.int8.npy and its scales, or
+    .float16.npy), so a quantized guesser scans them without gathering from the full copy; rebuild the
+    sub-index after `python vector_store.py --quantize`.
+    Clue words still come from the whole vocabulary.
+
+    python candidate_index.py [--limit 100000] [--pos n,v,a]
+"""
+
+CANDIDATE_PATH = STORE_PATH + '.candidates'
+
+
+def guessable(word: str, stopwords: Container[str]) -> bool:
+    return word.isalpha() and word.islower() and word not in stopwords
+
+
+class CandidateIndex:
+    """The guessable rows of the vocabulary and a contiguous copy of their vectors"""
+
+    def __init__(self, rows: np.ndarray, vectors: np.ndarray, size: int, quantized: Optional[np.ndarray] = None,
+                 scales: Optional[np.ndarray] = None) -> None:
+        self.rows = rows  # ascending vocabulary rows
+        self.vectors = vectors  # vectors[i] is the store's row rows[i]
+        self.quantized = quantized  # the same rows of the store's quantized copy, if it has one
+        self.scales = scales
+        self.member = np.zeros(size, dtype=bool)
+        self.member[rows] = True
+
+    @classmethod
+    def build(cls, store: VectorStore, stopwords: Container[str], deck: Container[str] = (), limit: int = 0,
+              parts_of_speech: str = '') -> 'CandidateIndex':
+        """Selects the rows (limit keeps only the first, most frequent, rows; deck words are always kept)"""
+        if parts_of_speech:
+            from nltk.corpus import wordnet
+            tags = set(parts_of_speech.replace('a', 'as'))  # WordNet tags satellite adjectives 's'
+        rows = []
+        for i, word in enumerate(store.index2word):
+            if word in deck:
+                rows.append(i)
+            elif (not limit or i < limit) and guessable(word, stopwords):
+                if not parts_of_speech or any(s.pos() in tags for s in wordnet.synsets(word)):
+                    rows.append(i)
+        rows = np.array(rows, dtype=np.int64)
+        quantized = None if store.quantized is None else np.ascontiguousarray(store.quantized[rows])
+        scales = None if store.scales is None else store.scales[rows]
+        return cls(rows, np.ascontiguousarray(store.vectors[rows], dtype=np.float32), len(store.index2word),
+                   quantized, scales)
+
+    @classmethod
+    def load(cls, size: int, path: str = CANDIDATE_PATH) -> 'CandidateIndex':
+        """Opens the index of a vocabulary of the given size. The matrix is memory mapped."""
+        rows = np.load(path + '.rows.npy')
+        if len(rows) and rows[-1] >= size:
+            raise ValueError(f'{path}.rows.npy refers to row {rows[-1]} but the vocabulary has {size} words')
+        index = cls(rows, np.load(path + '.npy', mmap_mode='r'), size)
+        for kind in QUANTIZATIONS:
+            if os.path.exists(f'{path}.{kind}.npy'):
+                index.quantized = np.load(f'{path}.{kind}.npy', mmap_mode='r')
+                if len(index.quantized) != len(rows):
+                    raise ValueError(f'{path}.{kind}.npy has {len(index.quantized)} rows but the index has {len(rows)}')
+                if kind == 'int8':
+                    index.scales = np.load(f'{path}.int8.scales.npy')
+                break
+        return index
+
+    def save(self, path: str = CANDIDATE_PATH) -> None:
+        np.save(path + '.npy', self.vectors)
+        np.save(path + '.rows.npy', self.rows)
+        remove_quantized(path)
+        if self.quantized is not None:
+            kind = 'int8' if self.quantized.dtype == np.int8 else 'float16'
+            np.save(f'{path}.{kind}.npy', self.quantized)
+            if self.scales is not None:
+                np.save(f'{path}.int8.scales.npy', self.scales)
+
+    def restrict(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        """The candidate rows among the given vocabulary rows (all of them if rows is None)"""
+        return self.rows if rows is None else rows[self.member[rows]]
+
+
+def load_candidate_index(store: VectorStore, path: str = CANDIDATE_PATH) -> Optional[CandidateIndex]:
+    """The sub-index built for this store, or None (every word is a candidate) if there isn't one"""
+    if not os.path.exists(path + '.npy'):
+        return None
+    return CandidateIndex.load(len(store.index2word), path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the candidate sub-index of guessable words.')
+    parser.add_argument('--store', default=STORE_PATH, help='path prefix of the converted store')
+    parser.add_argument('--output', default=CANDIDATE_PATH)
+    parser.add_argument('--limit', type=int, default=0, help='only keep words among the N most frequent (0 keeps all)')
+    parser.add_argument('--pos', default='', help='WordNet parts of speech to keep, e.g. n,v,a (needs the wordnet corpus)')
+    args = parser.parse_args()
+
+    model = VectorStore.load(args.store)
+    with open("data/catchphrase_words.txt", encoding='utf8') as file:
+        deck_words = {w.strip() for w in file}
+    with open("data/stopwords.txt", encoding='utf8') as file:
+        stopword_set = {w.strip() for w in file}
+    start = time.time()
+    candidate_index = CandidateIndex.build(model, stopword_set, deck_words, args.limit, args.pos.replace(',', ''))
+    candidate_index.save(args.output)
+    print(f'Kept {len(candidate_index.rows)} of {len(model.index2word)} words in {time.time() - start:.1f}s')
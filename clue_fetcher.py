@@ -0,0 +1,64 @@
+from typing import List, Tuple
+
+from tracing import tracer
+
+""" BabelNet definition fetcher.
+    One pooled session is reused for every word, requests have connect/read timeouts and bounded
+    retries, and the page is only parsed as far as the definition divs. The base URL can point at a
+    local stub server for tests and benchmarks. requests and bs4 are only imported once a fetcher is made.
+"""
+
+BABELNET_URL = 'https://babelnet.org'
+TIMEOUT = (3.05, 10)
+MAX_PAGE_BYTES = 4 * 1024 * 1024
+
+
+class ClueFetcher:
+    """Fetches raw definition text for a word from BabelNet (or anything that serves the same HTML)"""
+
+    def __init__(self, base_url: str = BABELNET_URL, timeout: Tuple[float, float] = TIMEOUT, retries: int = 2,
+                 pool_size: int = 4) -> None:
+        import requests
+        from bs4 import BeautifulSoup, SoupStrainer
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.soup = BeautifulSoup
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.definitions_only = SoupStrainer("div", {"class": "definition"})
+
+    def download(self, word: str) -> bytes:
+        """Streams the search page, stopping at MAX_PAGE_BYTES"""
+        with self.session.get(f'{self.base_url}/search', params={'word': word, 'lang': 'EN'},
+                              timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks, size = [], 0
+            for chunk in response.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_PAGE_BYTES:
+                    break
+        return b''.join(chunks)
+
+    def parse(self, page: bytes) -> List[str]:
+        """Pulls the definition text out of a search page, building a tree for the definition divs only"""
+        soup = self.soup(page, "html.parser", parse_only=self.definitions_only)
+        return [definition.text for definition in soup.find_all("div", {"class": "definition"})]
+
+    def fetch(self, word: str) -> List[str]:
+        with tracer.span('babelnet_request'):
+            page = self.download(word)
+        with tracer.span('babelnet_parse') as span:
+            definitions = self.parse(page)
+            span.note(bytes=len(page), definitions=len(definitions))
+        return definitions
+
+    def close(self) -> None:
+        self.session.close()
+
@@ -0,0 +1,127 @@
+#! /usr/bin/env python
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Container, List, Optional, Set
+
+from clue_fetcher import BABELNET_URL, ClueFetcher
+from linguistics import bad_clue, containment, parse_clue
+from tracing import tracer
+
+""" Local clue store.
+    Filtered, <blank>-substituted BabelNet definitions are kept in a SQLite file keyed by target word,
+    together with the time they were fetched. `python clue_store.py` prebuilds the store for the whole
+    deck so the game can run offline. Set CATCHPHRASE_OFFLINE=1 to never touch the network.
+"""
+
+CLUE_DB_PATH = 'data/clues.sqlite3'
+OFFLINE = os.environ.get('CATCHPHRASE_OFFLINE', '') not in ('', '0')
+
+_default_fetcher: ClueFetcher = None
+
+
+class ClueStore:
+    """Persistent map of target word -> clues. Safe to share between threads."""
+
+    def __init__(self, path: str = CLUE_DB_PATH) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS clues (word TEXT PRIMARY KEY, definitions TEXT NOT NULL, fetched REAL NOT NULL)')
+
+    def get(self, word: str) -> Optional[List[str]]:
+        """Stored clues for the word, or None on a miss. An empty list means BabelNet had nothing usable."""
+        with self.lock:
+            row = self.connection.execute('SELECT definitions FROM clues WHERE word = ?', (word,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, word: str, clues: List[str]) -> None:
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO clues VALUES (?, ?, ?)', (word, json.dumps(clues), time.time()))
+
+    def __contains__(self, word: str) -> bool:
+        with self.lock:
+            return self.connection.execute('SELECT 1 FROM clues WHERE word = ?', (word,)).fetchone() is not None
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def default_fetcher() -> ClueFetcher:
+    """Shared fetcher (and connection pool) for callers that don't bring their own"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = ClueFetcher()
+    return _default_fetcher
+
+
+def filter_definitions(word: str, definitions: List[str], vocab: Container[str], stopwords: Set[str]) -> List[str]:
+    """Blanks out the target word and drops definitions that would be illegal clues"""
+    with tracer.span('clue_filter') as span:
+        target = containment(word.lower())
+        clues = []
+        for definition in definitions:
+            clue = target.blank(definition.strip().lower())
+            if not bad_clue(word, parse_clue(clue, vocab, stopwords)):
+                clues.append(clue)
+        span.note(kept=len(clues), discarded=len(definitions) - len(clues))
+    return clues
+
+
+def generate_clues(word: str, store: ClueStore, vocab: Container[str], stopwords: Set[str],
+                   offline: bool = OFFLINE, fetcher: ClueFetcher = None) -> List[str]:
+    """Clues for the word from the store, going to BabelNet only on a miss (and never when offline)"""
+    with tracer.span('clue_store'):
+        clues = store.get(word)
+    if clues is not None:
+        return clues
+    if offline:
+        return []
+    import requests
+    try:
+        definitions = (fetcher or default_fetcher()).fetch(word)
+    except requests.RequestException:
+        return []
+    clues = filter_definitions(word, definitions, vocab, stopwords)
+    store.put(word, clues)
+    return clues
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prebuild the clue store for every word in the deck.')
+    parser.add_argument('--db', default=CLUE_DB_PATH, help='SQLite file to fill')
+    parser.add_argument('--refresh', action='store_true', help='refetch words that are already stored')
+    parser.add_argument('--base-url', default=BABELNET_URL, help='BabelNet (or stub server) to fetch from')
+    args = parser.parse_args()
+
+    from vector_store import load_model
+    model = load_model()
+    with open("data/catchphrase_words.txt", encoding='utf8') as file:
+        words = [w.strip() for w in file]
+    with open("data/stopwords.txt", encoding='utf8') as file:
+        stopwords = {w.strip() for w in file}
+    import requests
+    clue_store = ClueStore(args.db)
+    clue_fetcher = ClueFetcher(args.base_url)
+    failed = []
+    for i, word in enumerate(words, 1):
+        if args.refresh or word not in clue_store:
+            try:
+                definitions = clue_fetcher.fetch(word)
+            except requests.RequestException as error:  # Left out of the store, so the next run retries it
+                print(f'\r{word}: {error}')
+                failed.append(word)
+            else:
+                clue_store.put(word, filter_definitions(word, definitions, model.vocab, stopwords))
+        print(f'\r{i}/{len(words)} {word:<20}', end='', flush=True)
+    print()
+    if failed:
+        print(f'{len(failed)} of {len(words)} words could not be fetched; run again to retry them.')
+    print(f'Clue store {args.db} is ready.')
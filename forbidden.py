@@ -0,0 +1,114 @@
+#! /usr/bin/env python
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from linguistics import porter, rhyme_index, same_noun, singular_noun
+from vector_store import STORE_PATH, VectorStore
+
+""" Per-target forbidden vocabulary.
+    bad_clue() decides one word at a time whether a clue word is illegal for a target (same stem,
+    containment either way, or a rhyme that isn't just the plural). The deck and the vocabulary are
+    both fixed, so `python forbidden.py` works that out once for every deck word against the whole
+    vocabulary and stores one bit per vocabulary word: data/vectors.forbidden.npy (rows of packed
+    bits, memory mapped, so only the rows of words that come up are ever read) and
+    data/vectors.forbidden.words (the deck word of each row).
+    The checks are symmetric, so a row also says which guesses a deck word rules out when it is a clue.
+"""
+
+FORBIDDEN_PATH = STORE_PATH + '.forbidden'
+
+
+class ForbiddenMasks:
+    """One packed bitmask over the vocabulary per deck word, set where bad_clue(target, [word]) is true"""
+
+    def __init__(self, words: List[str], bits: np.ndarray, size: int) -> None:
+        self.rows: Dict[str, int] = {w: i for i, w in enumerate(words)}
+        self.bits = bits
+        self.size = size  # vocabulary size
+
+    def __contains__(self, target: str) -> bool:
+        return target in self.rows
+
+    @classmethod
+    def build(cls, targets: List[str], index2word: List[str]) -> 'ForbiddenMasks':
+        """Applies bad_clue's rules to the whole vocabulary at once, one target at a time"""
+        clues = [w.lower() for w in index2word]
+        clue_array = np.array(clues)
+        stems = np.array([porter().stem(c) for c in clues])
+        by_singular: Dict[str, List[int]] = {}
+        by_clue: Dict[str, List[int]] = {}
+        for i, clue in enumerate(clues):
+            by_singular.setdefault(singular_noun(clue), []).append(i)
+            by_clue.setdefault(clue, []).append(i)
+        rhymes = rhyme_index()
+        rhyme_classes = list(rhymes.keys.values())
+        bits = np.zeros((len(targets), (len(index2word) + 7) // 8), dtype=np.uint8)
+        for row, target in enumerate(targets):
+            target = target.lower()
+            mask = stems == porter().stem(target)
+            # The clue (singular) inside the target: look up every substring of the target
+            for start in range(len(target) + 1):
+                for end in range(start, len(target) + 1):
+                    mask[by_singular.get(target[start:end], [])] = True
+            # The target (singular) inside the clue
+            mask |= np.char.find(clue_array, singular_noun(target)) >= 0
+            # Rhymes that aren't plural forms of the target
+            for key in rhymes.word_keys.get(target, ()):
+                for word_id in rhyme_classes[key]:
+                    word = rhymes.words[word_id]
+                    if word != target and word in by_clue and not same_noun(target, word):
+                        mask[by_clue[word]] = True
+            bits[row] = np.packbits(mask)
+        return cls(list(targets), bits, len(index2word))
+
+    @classmethod
+    def load(cls, size: int, path: str = FORBIDDEN_PATH) -> 'ForbiddenMasks':
+        """Opens the masks of a vocabulary of the given size. The bits are memory mapped."""
+        bits = np.load(path + '.npy', mmap_mode='r')
+        if bits.shape[1] != (size + 7) // 8:
+            raise ValueError(f'{path}.npy covers {bits.shape[1] * 8} words but the vocabulary has {size}')
+        with open(path + '.words', encoding='utf8') as file:
+            words = [w.rstrip('\n') for w in file]
+        return cls(words, bits, size)
+
+    def save(self, path: str = FORBIDDEN_PATH) -> None:
+        np.save(path + '.npy', np.ascontiguousarray(self.bits))
+        with open(path + '.words', 'w', encoding='utf8') as file:
+            file.writelines(w + '\n' for w in self.rows)
+
+    def mask(self, target: str) -> np.ndarray:
+        """Boolean mask over the vocabulary of the words that are illegal clues for the target"""
+        return np.unpackbits(self.bits[self.rows[target]], count=self.size).view(bool)
+
+    def illegal(self, target: str, indices: np.ndarray) -> np.ndarray:
+        """Which of the given vocabulary rows are illegal for the target, reading only their bits"""
+        row = self.bits[self.rows[target]]
+        return (row[indices >> 3] >> (7 - (indices & 7))) & 1 == 1
+
+
+def load_forbidden(store: VectorStore, path: str = FORBIDDEN_PATH) -> Optional[ForbiddenMasks]:
+    """The masks built for this store, or None (bad_clue is used directly) if there aren't any"""
+    if not os.path.exists(path + '.npy'):
+        return None
+    return ForbiddenMasks.load(len(store.index2word), path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the forbidden-vocabulary masks for every deck word.')
+    parser.add_argument('--store', default=STORE_PATH, help='path prefix of the converted store')
+    parser.add_argument('--output', default=FORBIDDEN_PATH)
+    args = parser.parse_args()
+
+    from vector_store import load_model
+    model = VectorStore.load(args.store) if os.path.exists(args.store + '.npy') else load_model()
+    with open("data/catchphrase_words.txt", encoding='utf8') as file:
+        deck = [w.strip() for w in file]
+    start = time.time()
+    forbidden = ForbiddenMasks.build(deck, model.index2word)
+    forbidden.save(args.output)
+    print(f'Wrote masks for {len(deck)} words over {forbidden.size} vocabulary words in {time.time() - start:.1f}s')
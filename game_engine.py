@@ -0,0 +1,275 @@
+import threading
+import time
+import uuid
+from random import shuffle
+from typing import List, NamedTuple, Optional, Set
+
+import numpy as np
+from fastDamerauLevenshtein import damerauLevenshtein
+
+from ann_index import LOAD_NPROBE, IVFIndex, load_ann_index
+from candidate_index import CandidateIndex, load_candidate_index
+from clue_store import ClueStore, generate_clues
+from forbidden import ForbiddenMasks, load_forbidden
+from guess_engine import GuessEngine, GuessState
+from linguistics import bad_clue, convert_singular, parse_clue, preload
+from prefetch import CluePrefetcher
+from tracing import tracer
+from vector_store import VectorStore, load_model
+
+""" UI-free game engine.
+    GameSession holds one player's state and runs the same turn state machine as Play_game
+    (human gives clues, then computer gives clues, and so on) without touching curses or stdin.
+    Everything a session needs to read lives in GameResources, which is loaded once and shared by
+    every session in the process.
+"""
+
+INSTRUCTIONS = 'Enter q at anytime to quit, y if the word is correct, n to get a new word, and s to convert to singular.'
+NO_CLUES = "I'm out of clues!"
+GRACE_TIME = 2  # Seconds input is still taken after the clock reads zero
+
+HUMAN_CLUES = 'human_clues'
+COMPUTER_CLUES = 'computer_clues'
+GAME_OVER = 'game_over'
+
+
+class GameResources:
+    """Read-only state shared by every session: the model, guess engine, clue store, stopwords and deck"""
+
+    def __init__(self, model: VectorStore, clue_store: ClueStore, stopwords: Set[str], words: List[str],
+                 index: Optional[IVFIndex] = None, forbidden: Optional[ForbiddenMasks] = None,
+                 candidates: Optional[CandidateIndex] = None) -> None:
+        self.model = model
+        self.forbidden = forbidden
+        self.guess_engine = GuessEngine(model, index=index, forbidden=forbidden, candidates=candidates)
+        self.clue_store = clue_store
+        self.stopwords = stopwords
+        self.words = words
+
+    @classmethod
+    def load(cls, model: VectorStore = None, nprobe: int = LOAD_NPROBE) -> 'GameResources':
+        """Reads the deck, stopwords, clue store, ANN index, forbidden masks and candidate sub-index.
+        The model is loaded too unless one is passed in. nprobe overrides the ANN index's own, if not 0."""
+        with open("data/catchphrase_words.txt", encoding='utf8') as file:
+            words = [w.strip() for w in file]
+        with open("data/stopwords.txt", encoding='utf8') as file:
+            stopwords = {w.strip() for w in file}
+        preload()
+        model = model or load_model()
+        return cls(model, ClueStore(), stopwords, words, load_ann_index(model, nprobe=nprobe), load_forbidden(model),
+                   load_candidate_index(model))
+
+    def clue_parser(self, clue: str) -> List[str]:
+        return parse_clue(clue, self.model.vocab, self.stopwords)
+
+    def illegal_word(self, word: str, clue: List[str]) -> str:
+        """Same answer as bad_clue(word, clue), read from the word's forbidden mask when there is one"""
+        if self.forbidden is None or word not in self.forbidden:
+            return bad_clue(word, clue)
+        vocab = self.model.vocab
+        flagged = self.forbidden.illegal(word, np.array([vocab.get(w, 0) for w in clue], dtype=np.int64))
+        for clue_word, illegal in zip(clue, flagged):
+            if (illegal if clue_word in vocab else bad_clue(word, [clue_word])):
+                return clue_word
+        return ''
+
+    def generate_guess(self, clue: List[str], already_guessed: List[str]) -> str:
+        """Returns the computer's guess for that try."""
+        return self.guess_engine.best_guess(clue, already_guessed)
+
+    def generate_clues(self, word: str) -> List[str]:
+        return generate_clues(word, self.clue_store, self.model.vocab, self.stopwords)
+
+
+class ResourceLoader(threading.Thread):
+    """Runs GameResources.load() in the background, so a front end can show its splash screen right away"""
+
+    def __init__(self) -> None:
+        super(ResourceLoader, self).__init__()
+        self.resources: Optional[GameResources] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+        self.load_time = 0.0
+        self.wait_time = 0.0
+        self.name = 'resource-loader'
+        self.daemon = True
+        self.start()
+
+    def run(self) -> None:
+        start = time.time()
+        try:
+            with tracer.span('resource_load'):
+                self.resources = GameResources.load()
+        except BaseException as error:  # Handed to the thread that calls result()
+            self.error = error
+        self.load_time = time.time() - start
+        self.done.set()
+
+    def ready(self) -> bool:
+        return self.done.is_set()
+
+    def result(self) -> GameResources:
+        """The loaded resources, waiting for them if the player got here first"""
+        if not self.done.is_set():
+            start = time.time()
+            with tracer.span('startup_wait'):
+                self.done.wait()
+            self.wait_time += time.time() - start
+        if self.error is not None:
+            raise self.error
+        return self.resources
+
+    def report(self, first_screen: float) -> str:
+        """first_screen: seconds from the start of the front end's main block to its title screen"""
+        return (f'Startup: first screen after {first_screen:.2f}s, loaded in {self.load_time:.2f}s, '
+                f'waited {self.wait_time:.2f}s')
+
+
+class Deck:
+    """The words left to play, shared by everyone dealing from it (the player's turns and the clue prefetcher).
+    Reshuffled once it runs out, whoever draws the last word."""
+
+    def __init__(self, words: List[str]) -> None:
+        self.words = list(words)
+        self.remaining: List[str] = []
+        self.lock = threading.Lock()
+
+    def draw(self) -> str:
+        with self.lock:
+            if not self.remaining:
+                self.remaining = list(self.words)
+                shuffle(self.remaining)
+            return self.remaining.pop()
+
+
+class Reply(NamedTuple):
+    """What the front end should show (and play) in response to one input"""
+    messages: List[str]
+    sound: Optional[str] = None  # 'point', 'skip' or 'game_over'
+
+
+class GameSession:
+    """One player's game. Feed it input lines with handle() and show the replies."""
+
+    def __init__(self, resources: GameResources, total_time: int, prefetcher: Optional[CluePrefetcher] = None,
+                 deck: Optional[Deck] = None) -> None:
+        self.resources = resources
+        self.prefetcher = prefetcher  # deals the computer's words with their clues already generated, if given
+        self.deck = deck or Deck(resources.words)  # pass the prefetcher's deck so both sides deal from it
+        self.id = uuid.uuid4().hex[:12]
+        self.turn = 0
+        self.total_time = total_time  # What the clock counts down from
+        self.time_limit = total_time + GRACE_TIME
+        self.start_time = time.time()
+        self.score = 0
+        self.state = HUMAN_CLUES
+        self.word = ''
+        self.guess = ''
+        self.guess_state = GuessState(resources.guess_engine)
+        self.clues: List[str] = []
+
+    @property
+    def over(self) -> bool:
+        return self.state == GAME_OVER
+
+    def time_left(self) -> float:
+        """Seconds left on the clock"""
+        return max(0.0, self.start_time + self.total_time - time.time())
+
+    def input_time_left(self) -> float:
+        """Seconds until input stops being taken, the grace period included"""
+        return max(0.0, self.start_time + self.time_limit - time.time())
+
+    def out_of_time(self) -> bool:
+        """Helper function to check if the user is within the time limit"""
+        return time.time() - self.time_limit >= self.start_time
+
+    def start(self) -> Reply:
+        """Deals the first word"""
+        return Reply(self.new_human_word())
+
+    def new_human_word(self) -> List[str]:
+        self.state = HUMAN_CLUES
+        self.turn += 1
+        tracer.bind(self.id, self.turn, 'human')
+        self.word = self.deck.draw()
+        self.guess = ''
+        self.guess_state = GuessState(self.resources.guess_engine)
+        return [f'Your word is "{self.word}". Good Luck!']
+
+    def new_computer_word(self) -> List[str]:
+        self.state = COMPUTER_CLUES
+        self.turn += 1
+        tracer.bind(self.id, self.turn, 'computer')
+        if self.prefetcher is not None:
+            self.word, self.clues = self.prefetcher.next()
+        else:
+            self.word = self.deck.draw()
+            self.clues = self.resources.generate_clues(self.word)
+        return ['My turn to give a clue!', self.clue_popper()]
+
+    def clue_popper(self) -> str:
+        """Helper function to give the user clues. Prevents a crash when there are no clues left (empty list)"""
+        if self.clues:
+            return self.clues.pop(0)
+        return NO_CLUES
+
+    def end(self, messages: List[str]) -> Reply:
+        self.state = GAME_OVER
+        return Reply(messages + [f'Game over! Your score was {self.score}.'], 'game_over')
+
+    def handle(self, user_input: str) -> Reply:
+        """Advances the game by one line of player input. Blocking (guesses, clue fetches): run it off the event loop."""
+        user_input = user_input.lower().strip()
+        if self.over:
+            return Reply([])
+        tracer.bind(self.id, self.turn, 'human' if self.state == HUMAN_CLUES else 'computer')
+        if self.out_of_time():
+            return self.end(['You ran out of time.'])
+        if user_input == 'q':
+            if self.state == COMPUTER_CLUES:
+                return self.end([f'The word was {self.word}!'])
+            return self.end([])
+        if self.state == HUMAN_CLUES:
+            return self.human_give_clues(user_input)
+        return self.computer_give_clues(user_input)
+
+    def human_give_clues(self, user_input: str) -> Reply:
+        """One step of the part of the game when the user is giving clues."""
+        if user_input == 'y':
+            self.score += 1
+            return Reply(self.new_computer_word(), 'point')
+        if user_input == 'n':
+            return Reply(self.new_human_word(), 'skip')
+        if user_input == 's':
+            if self.guess:
+                self.guess_state.add_clue([self.guess])
+                return Reply([f'Is "{convert_singular(self.guess)}" your word?'])
+            return Reply([])
+        if not user_input:
+            return Reply([])
+        with tracer.span('validate_clue'):
+            clue = self.resources.clue_parser(user_input)
+            illegal_word = self.resources.illegal_word(self.word, clue)
+        if illegal_word:
+            return Reply([f'Sorry, "{illegal_word}" is an illegal word for a clue. Try again.'])
+        if not clue:
+            return Reply(['Please enter a valid clue.'])
+        self.guess_state.add_clue(clue)
+        self.guess = self.guess_state.next_guess()
+        return Reply([f'Is "{self.guess}" your word?'])
+
+    def computer_give_clues(self, user_input: str) -> Reply:
+        """One step of the part of the game when the computer is giving clues."""
+        if user_input == 'y':  # The player says they got it: a point, as on the human's turn
+            self.score += 1
+            return Reply([f'The word was {self.word}!'] + self.new_computer_word(), 'point')
+        if user_input == 'n':
+            return Reply([f'The word was {self.word}!'] + self.new_computer_word(), 'skip')
+        similarity = damerauLevenshtein(self.word, user_input, True)
+        if similarity == 1:
+            self.score += 1
+            return Reply(['Correct!'] + self.new_human_word(), 'point')
+        if similarity >= 0.75:
+            return Reply(['You are just a couple of letters off. Try Again!'])
+        return Reply(['Try Again!', self.clue_popper()])
@@ -0,0 +1,166 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from ann_index import IVFIndex
+from candidate_index import CandidateIndex
+from forbidden import ForbiddenMasks
+from linguistics import bad_clue
+from tracing import tracer
+from vector_store import VectorStore, quantized_scores
+
+NO_GUESS = "I'm sorry. I don't know what else to say..."
+
+
+class GuessEngine:
+    """Ranks the vocabulary against a clue directly on the store's normalized matrix.
+    Excluded words are masked out before ranking, and results are produced in pages so the caller
+    only pays for the candidates it actually looks at. With an IVF index only the probed clusters are scored,
+    and with a candidate sub-index only guessable words are."""
+
+    def __init__(self, store: VectorStore, page_size: int = 50, max_candidates: int = 2000,
+                 index: Optional[IVFIndex] = None, rerank_factor: int = 4,
+                 forbidden: Optional[ForbiddenMasks] = None, candidates: Optional[CandidateIndex] = None) -> None:
+        self.store = store
+        self.index = index
+        self.candidate_index = candidates
+        self.forbidden = forbidden
+        self.rerank_factor = rerank_factor  # shortlist size per page, as a multiple of the page, when quantized
+        self.page_size = page_size
+        self.max_candidates = max_candidates
+        # Guesses are compared lowercase, so excluding a word excludes every casing of it
+        self.by_lower: Dict[str, List[int]] = {}
+        for i, w in enumerate(store.index2word):
+            self.by_lower.setdefault(w.lower(), []).append(i)
+
+    def query(self, clue_words: Iterable[str]) -> np.ndarray:
+        """Unit vector for the mean of the clue words, or None if none of them are in the vocabulary"""
+        indices = [self.store.vocab[w] for w in clue_words if w in self.store.vocab]
+        if not indices:
+            return None
+        query = np.asarray(self.store.vectors[indices], dtype=np.float32).mean(axis=0)
+        return query / (np.linalg.norm(query) or 1)
+
+    def exclusion_mask(self, words: Iterable[str]) -> np.ndarray:
+        """Boolean mask over the vocabulary marking every casing of the given words"""
+        mask = np.zeros(len(self.store.index2word), dtype=bool)
+        for w in words:
+            mask[self.by_lower.get(w.lower(), [])] = True
+        return mask
+
+    def rank(self, query: np.ndarray, mask: np.ndarray) -> Iterator[int]:
+        """Yields vocabulary indices by descending similarity, skipping masked rows.
+        Each page is found with argpartition and then the page size doubles. When the store has a
+        quantized copy, that is what gets scanned, and each page's shortlist is re-scored exactly."""
+        rows = None if self.index is None else self.index.probe(query)
+        if self.candidate_index is not None:
+            rows = self.candidate_index.restrict(rows)
+        if rows is not None:
+            mask = mask[rows]
+        quantized = self.store.quantized is not None
+        contiguous = self.candidate_index is not None and self.index is None  # Scan the sub-index's own matrix
+        if quantized and contiguous and self.candidate_index.quantized is not None:
+            scores = quantized_scores(self.candidate_index.quantized, self.candidate_index.scales, query)
+        elif quantized:
+            scores = self.store.approximate_scores(query, rows)
+        elif contiguous:
+            scores = np.asarray(self.candidate_index.vectors @ query, dtype=np.float32)  # Contiguous, no gather
+        else:
+            scores = np.asarray((self.store.vectors if rows is None else self.store.vectors[rows]) @ query,
+                                dtype=np.float32)
+        scores[mask] = -np.inf
+        remaining = min(len(scores) - int(mask.sum()), self.max_candidates)
+        k = self.page_size
+        while remaining > 0:
+            k = min(k, remaining)
+            shortlist_size = min(k * self.rerank_factor, remaining) if quantized else k
+            top = np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+            if quantized:
+                ids = top if rows is None else rows[top]
+                order = np.argsort(ids)  # Gather rows in file order
+                exact = np.empty(len(ids), dtype=np.float32)
+                exact[order] = self.store.vectors[ids[order]] @ query
+                top = top[np.argsort(-exact, kind='stable')[:k]]
+            else:
+                top = top[np.argsort(-scores[top], kind='stable')]
+            yield from (top if rows is None else rows[top]).tolist()
+            scores[top] = -np.inf
+            remaining -= k
+            k *= 2
+
+    def candidates(self, clue_words: List[str], excluded: Iterable[str] = ()) -> Iterator[str]:
+        """Yields candidate guesses for the clue, best first. Clue words are never candidates."""
+        query = self.query(clue_words)
+        if query is None:
+            return
+        mask = self.exclusion_mask(list(clue_words) + list(excluded))
+        for i in self.rank(query, mask):
+            yield self.store.index2word[i]
+
+    def best_guess(self, clue: List[str], already_guessed: List[str]) -> str:
+        """Returns the computer's guess for that try: the best candidate that is new and a legal answer for the clue."""
+        state = GuessState(self)
+        state.exclude(already_guessed)
+        state.add_clue(clue)
+        return state.next_guess()
+
+
+class GuessState:
+    """One turn's guessing state, updated as clues arrive instead of rebuilt from the whole clue list.
+    Keeps the running sum of the clue vectors and a mask of every word that can no longer be guessed
+    (clue words, earlier guesses and candidates found illegal), so a new clue costs O(new words).
+    A clue word with a precomputed forbidden mask rules out every guess it makes illegal in one OR."""
+
+    def __init__(self, engine: GuessEngine) -> None:
+        self.engine = engine
+        self.clue_words: List[str] = []  # Those still checked with bad_clue, candidate by candidate
+        self.vector_sum = np.zeros(engine.store.vectors.shape[1], dtype=np.float32)
+        self.count = 0
+        self.mask = np.zeros(len(engine.store.index2word), dtype=bool)
+
+    def exclude(self, words: Iterable[str]) -> None:
+        """Masks every casing of the given words"""
+        for w in words:
+            self.mask[self.engine.by_lower.get(w.lower(), [])] = True
+
+    def add_clue(self, words: List[str]) -> None:
+        """Folds new clue words into the running vector and the exclusions"""
+        vocab = self.engine.store.vocab
+        for w in words:
+            if w in vocab:
+                self.vector_sum += self.engine.store.vectors[vocab[w]]
+                self.count += 1
+        forbidden = self.engine.forbidden
+        for w in words:
+            if forbidden is not None and w in forbidden:
+                self.mask |= forbidden.mask(w)
+            else:
+                self.clue_words.append(w)
+        self.exclude(words)
+
+    def query(self) -> np.ndarray:
+        """Unit vector for the clue so far (the normalized sum points the same way as the mean), or None"""
+        if not self.count:
+            return None
+        return self.vector_sum / (np.linalg.norm(self.vector_sum) or 1)
+
+    def next_guess(self) -> str:
+        """The best legal candidate that hasn't been guessed yet.
+        Every candidate looked at is masked afterwards: the guess so it isn't repeated, and rejected ones
+        because clues only grow, so a word that is illegal now stays illegal for the rest of the turn."""
+        query = self.query()
+        if query is None:
+            return NO_GUESS
+        with tracer.span('guess') as span:
+            rejected = 0
+            for i in self.engine.rank(query, self.mask):
+                guess = self.engine.store.index2word[i].lower()
+                if self.mask[i]:  # Another casing was already rejected during this ranking
+                    continue
+                self.exclude([guess])
+                if not bad_clue(guess, self.clue_words):
+                    span.note(rejected=rejected)
+                    return guess
+                rejected += 1
+            span.note(rejected=rejected)
+        return NO_GUESS
@@ -0,0 +1,200 @@
+import re
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Container, Dict, Iterable, List, Set
+
+from rhyme_index import RhymeIndex, load_rhyme_index
+
+""" Shared linguistic primitives.
+    Stemming, singularization and inflect comparisons are pure functions of their arguments and the
+    same words come up over and over in a session, so each one is memoized in a bounded LRU cache.
+    cache_stats() counts hits and misses (cache_report() prints them at exit), and warm_up() fills the caches before play starts.
+    inflect and nltk are slow to import, so they are imported on first use (or by preload(), off the main thread).
+    The inflect engine is shared by every thread but keeps mode state (compare() switches it to classical
+    plurals and doesn't always switch back), so every call into it holds _inflect_lock and restores the mode.
+"""
+
+CACHE_SIZE = 65536
+NON_CHAR = re.compile(r'[^\w ]')
+
+_plural = None
+_stemmer = None
+_engine_lock = threading.Lock()
+_inflect_lock = threading.Lock()
+_rhyme_index: RhymeIndex = None
+_rhyme_lock = threading.Lock()
+
+
+def inflection():
+    """The inflect engine, imported on first use"""
+    global _plural
+    if _plural is None:
+        with _engine_lock:
+            if _plural is None:
+                from inflect import engine
+                _plural = engine()
+    return _plural
+
+
+def porter():
+    """The Porter stemmer, imported on first use"""
+    global _stemmer
+    if _stemmer is None:
+        with _engine_lock:
+            if _stemmer is None:
+                from nltk.stem.porter import PorterStemmer
+                _stemmer = PorterStemmer()
+    return _stemmer
+
+
+def rhyme_index() -> RhymeIndex:
+    """The rhyme index is loaded on first use"""
+    global _rhyme_index
+    if _rhyme_index is None:
+        with _rhyme_lock:
+            if _rhyme_index is None:
+                _rhyme_index = load_rhyme_index()
+    return _rhyme_index
+
+
+def use_rhyme_index(index: RhymeIndex) -> None:
+    """Uses the given index instead of data/rhymes.json (the benchmarks and tests bring their own)"""
+    global _rhyme_index
+    with _rhyme_lock:
+        _rhyme_index = index
+
+
+def preload() -> None:
+    """Imports and builds everything the primitives use, so the first clue doesn't pay for it"""
+    inflection()
+    porter()
+    rhyme_index()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def stem(word: str) -> str:
+    return porter().stem(word)
+
+
+def singular_noun(word: str) -> str:
+    """convert_singular without the cache, for one-off passes over the whole vocabulary"""
+    if not word:  # inflect rejects the empty string
+        return word
+    engine = inflection()
+    with _inflect_lock:
+        return engine.singular_noun(word) or word
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def convert_singular(word: str) -> str:
+    """
+    plural.singular_noun returns the singular of the given word or None.
+    This function modifies that behavior by returning the original word if already singular
+    """
+    return singular_noun(word)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def same_noun(word: str, other: str) -> bool:
+    """True if inflect considers the words to be singular/plural forms of each other (or equal)"""
+    engine = inflection()
+    with _inflect_lock:
+        classical = engine.classical_dict
+        try:
+            return bool(engine.compare(word, other))
+        finally:
+            engine.classical_dict = classical
+
+
+class Containment:
+    """Literal containment checks against one target, in both directions, without building any regex.
+    Every substring of the target is kept in a set, so "is this clue word (singular) inside the target"
+    is a lookup, and the target (singular) is found in all the clue words with one pass of str.find."""
+
+    def __init__(self, word: str) -> None:
+        self.word = word
+        self.singular = convert_singular(word) if word else word
+        self.substrings = {word[i:j] for i in range(len(word) + 1) for j in range(i, len(word) + 1)}
+
+    def matches(self, clue_words: List[str]) -> List[bool]:
+        """For each clue word: its singular is inside the target, or the target's singular is inside it"""
+        if not clue_words:
+            return []
+        hits = [(convert_singular(c) if c else c) in self.substrings for c in clue_words]
+        joined = '\0'.join(clue_words)
+        starts = []
+        position = 0
+        for clue in clue_words:
+            starts.append(position)
+            position += len(clue) + 1
+        found = joined.find(self.singular)
+        while found != -1:
+            i = bisect_right(starts, found) - 1
+            hits[i] = True
+            if i + 1 == len(starts):
+                break
+            found = joined.find(self.singular, starts[i + 1])
+        return hits
+
+    def blank(self, text: str, replacement: str = '<blank>') -> str:
+        """Replaces every occurrence of the target in the text"""
+        return text.replace(self.word, replacement)
+
+
+@lru_cache(maxsize=1024)
+def containment(word: str) -> Containment:
+    return Containment(word)
+
+
+def parse_clue(clue: str, vocab: Container[str], stopwords: Set[str]) -> List[str]:
+    """Takes string, splits on whitespace, removes non-letter characters, stopwords, oov words, and 'blank'"""
+    return [w for w in NON_CHAR.sub('', clue).split() if w not in stopwords and w != 'blank' and w in vocab]
+
+
+def bad_clue(word: str, clue_words: List[str]) -> str:
+    """This function returns illegal words in clues or an empty string if it's legal"""
+    word_stem = stem(word)
+    word = word.lower()
+    contained = containment(word).matches(clue_words)
+    rhyming = rhyme_index().rhymes_with_any(word, clue_words)
+    for clue, inside, rhymes in zip(clue_words, contained, rhyming):
+        clue_stem = stem(clue)
+        # Check for same roots (PorterStemmer might be too stringent, but we like a clean game)
+        if word_stem == clue_stem:
+            return clue
+        # Check containment
+        if inside:
+            return clue
+        # Check rhyming, unless the clue is just the plural (or singular) of the word
+        if rhymes and not same_noun(word, clue):
+            return clue
+    return ""
+
+
+def cache_stats() -> Dict[str, tuple]:
+    """Hit/miss counters (functools CacheInfo) for every memoized primitive"""
+    return {f.__name__: f.cache_info() for f in (stem, convert_singular, same_noun, containment)}
+
+
+def cache_report() -> str:
+    """One line of cache hit rates, printed at exit next to the other reports"""
+    parts = []
+    for name, info in cache_stats().items():
+        total = info.hits + info.misses
+        parts.append(f'{name} {info.hits}/{total} ({info.hits / total if total else 0.0:.0%})')
+    return 'Linguistic cache hits: ' + ', '.join(parts)
+
+
+def warm_up(words: Iterable[str], vocab: Iterable[str] = (), vocab_limit: int = 20000) -> None:
+    """Pre-populates the stem and singular caches with the deck and the most frequent vocabulary words"""
+    for i, word in enumerate(vocab):
+        if i >= vocab_limit:
+            break
+        stem(word)
+        convert_singular(word)
+    for word in words:
+        stem(word)
+        convert_singular(word)
+        convert_singular(word.lower())
+    rhyme_index()
@@ -0,0 +1,61 @@
+import queue
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from tracing import tracer
+
+""" Background clue prefetching.
+    The computer's next word is drawn from the deck and its clues are generated while the human is
+    still giving clues, so the computer's turn can start without waiting on the clue store or BabelNet.
+    Words are drawn through the same callable the human's turns use (game_engine.Deck.draw), so the
+    two sides never get the same word and a used-up deck is reshuffled the same way for both.
+"""
+
+
+class CluePrefetcher(threading.Thread):
+    """Keeps a bounded queue of (word, clues) pairs ready for the computer's turns"""
+
+    def __init__(self, draw: Callable[[], str], generate_clues: Callable[[str], List[str]], depth: int = 2) -> None:
+        super(CluePrefetcher, self).__init__()
+        self.draw = draw
+        self.generate_clues = generate_clues
+        self.ready: queue.Queue = queue.Queue(maxsize=depth)
+        self.hits = 0
+        self.misses = 0
+        self.wait_time = 0.0
+        self.name = 'clue-prefetch'
+        self.daemon = True
+        self.start()
+
+    def run(self) -> None:
+        while True:
+            word = self.draw()
+            try:
+                clues = self.generate_clues(word)
+            except Exception:
+                clues = []
+            self.ready.put((word, clues))
+
+    def next(self) -> Tuple[str, List[str]]:
+        """Returns the next word and its clues, blocking only if the worker hasn't finished it yet"""
+        try:
+            item = self.ready.get_nowait()
+            waited = False
+        except queue.Empty:
+            start = time.time()
+            with tracer.span('prefetch_wait'):
+                item = self.ready.get()
+            self.wait_time += time.time() - start
+            waited = True
+        if waited:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return item
+
+    def report(self) -> str:
+        """Prefetch hit rate and time spent waiting on the worker"""
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f'Clue prefetch: {self.hits}/{total} ready ({rate:.0%}), waited {self.wait_time:.2f}s'
@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+
+import json
+import os
+from typing import Dict, FrozenSet, Iterable, List
+
+""" Rhyme-class index.
+    Two words rhyme (in the pronouncing.rhymes sense) when they share the "rhyming part" of any of
+    their pronunciations. The index is built once from cmudict and stored in data/rhymes.json as
+    {"words": [...], "keys": {rhyming part: [word ids]}}, so a rhyme check is a set intersection of
+    small ints instead of a scan over the dictionary.
+"""
+
+RHYME_PATH = 'data/rhymes.json'
+
+
+class RhymeIndex:
+    """Maps every cmudict word to the ids of its rhyming parts"""
+
+    def __init__(self, words: List[str], keys: Dict[str, List[int]]) -> None:
+        self.words = words
+        self.keys = keys
+        key_sets: Dict[str, set] = {}
+        for key_id, word_ids in enumerate(keys.values()):
+            for word_id in word_ids:
+                key_sets.setdefault(words[word_id], set()).add(key_id)
+        self.word_keys: Dict[str, FrozenSet[int]] = {w: frozenset(k) for w, k in key_sets.items()}
+
+    @classmethod
+    def build(cls) -> 'RhymeIndex':
+        """Builds the index from the cmudict data shipped with pronouncing"""
+        import pronouncing
+        pronouncing.init_cmu()
+        word_ids: Dict[str, int] = {}
+        keys: Dict[str, List[int]] = {}
+        for word, phones in pronouncing.pronunciations:
+            word_id = word_ids.setdefault(word, len(word_ids))
+            members = keys.setdefault(pronouncing.rhyming_part(phones), [])
+            if not members or members[-1] != word_id:
+                members.append(word_id)
+        return cls(list(word_ids), keys)
+
+    @classmethod
+    def load(cls, path: str = RHYME_PATH) -> 'RhymeIndex':
+        with open(path, encoding='utf8') as file:
+            data = json.load(file)
+        return cls(data['words'], data['keys'])
+
+    def save(self, path: str = RHYME_PATH) -> None:
+        """Writes a temporary file next to the index and renames it into place, so readers never see half of it"""
+        temporary = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary, 'w', encoding='utf8') as file:
+                json.dump({'words': self.words, 'keys': self.keys}, file)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def rhymes_with_any(self, word: str, candidates: Iterable[str]) -> List[bool]:
+        """Checks a whole batch of candidates against one word: for each, whether it is a different word that
+        rhymes with it. Same result as `candidate in pronouncing.rhymes(word)`."""
+        word = word.lower()
+        word_keys = self.word_keys.get(word, frozenset())
+        return [c.lower() != word and not word_keys.isdisjoint(self.word_keys.get(c.lower(), ()))
+                for c in candidates]
+
+
+def load_rhyme_index(path: str = RHYME_PATH) -> RhymeIndex:
+    """Loads the persisted index, building and saving it on first use"""
+    if os.path.exists(path):
+        return RhymeIndex.load(path)
+    index = RhymeIndex.build()
+    index.save(path)
+    return index
+
+
+if __name__ == '__main__':
+    rhyme_index = RhymeIndex.build()
+    rhyme_index.save()
+    print(f'Wrote {len(rhyme_index.words)} words and {len(rhyme_index.keys)} rhyme classes to {RHYME_PATH}')
@@ -0,0 +1,137 @@
+#! /usr/bin/env python
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from ann_index import LOAD_NPROBE
+from clue_store import generate_clues
+from game_engine import GameResources
+from guess_engine import GuessState
+from linguistics import rhyme_index
+from vector_store import load_model
+from workers import SharedStore, attach_store, release, share_store
+
+""" Computer-vs-computer self-play.
+    For every word in the deck the computer gives the stored clues one at a time and guesses after
+    each, exactly as in a human turn, until it names the word or runs out of clues. The deck is
+    spread over a process pool sharing one copy of the vectors (see workers.py).
+    Reports solve rate, guesses to solve and time per word, to compare vocabularies, filters and indexes.
+
+    python selfplay.py --output before.json
+    python selfplay.py --output after.json --compare before.json
+"""
+
+MAX_CLUES = 10
+
+
+class WordResult(NamedTuple):
+    word: str
+    clues: int  # clues available for the word
+    guesses: int
+    solved: bool
+    seconds: float
+
+
+resources = None  # GameResources of this worker process
+blocks = []
+settings: Dict[str, object] = {}
+
+
+def init_worker(handle: SharedStore, offline: bool, max_clues: int, nprobe: int) -> None:
+    global resources, blocks
+    blocks, store = attach_store(handle)  # Kept global so the views stay valid
+    resources = GameResources.load(store, nprobe)
+    settings.update(offline=offline, max_clues=max_clues)
+
+
+def play_word(word: str) -> WordResult:
+    """One computer turn: clue, guess, repeat"""
+    start = time.perf_counter()
+    clues = generate_clues(word, resources.clue_store, resources.model.vocab, resources.stopwords,
+                           offline=settings['offline'])
+    state = GuessState(resources.guess_engine)
+    guesses = 0
+    for clue in clues[:settings['max_clues']]:
+        clue_words = resources.clue_parser(clue)
+        if not clue_words:
+            continue
+        state.add_clue(clue_words)
+        guesses += 1
+        if state.next_guess().replace('_', ' ') == word.lower():
+            return WordResult(word, len(clues), guesses, True, time.perf_counter() - start)
+    return WordResult(word, len(clues), guesses, False, time.perf_counter() - start)
+
+
+def summarize(results: List[WordResult], wall_time: float) -> Dict[str, float]:
+    solved = [r for r in results if r.solved]
+    playable = [r for r in results if r.clues]
+    milliseconds = np.array([r.seconds for r in results]) * 1000
+    to_solve = np.array([r.guesses for r in solved])
+    return {
+        'words': len(results),
+        'words_with_clues': len(playable),
+        'solved': len(solved),
+        'solve_rate': len(solved) / max(len(results), 1),
+        'solve_rate_with_clues': len(solved) / max(len(playable), 1),
+        'mean_guesses_to_solve': float(to_solve.mean()) if len(solved) else 0.0,
+        'median_guesses_to_solve': float(np.median(to_solve)) if len(solved) else 0.0,
+        'p50_ms_per_word': float(np.percentile(milliseconds, 50)),
+        'p95_ms_per_word': float(np.percentile(milliseconds, 95)),
+        'wall_s': wall_time,  # including loading the model and starting the pool
+        'words_per_s': len(results) / max(wall_time, 1e-12),
+    }
+
+
+def run(words: List[str], workers: int, offline: bool, max_clues: int, nprobe: int = LOAD_NPROBE) -> List[WordResult]:
+    """Plays every word, in deck order, on a pool of spawned worker processes"""
+    rhyme_index()  # Built (and saved) here on first use, rather than by every worker at once
+    model = load_model()
+    shared, handle = share_store(model)
+    initargs = (handle, offline, max_clues, nprobe)
+    del model
+    try:
+        with ProcessPoolExecutor(workers, mp_context=get_context('spawn'), initializer=init_worker,
+                                 initargs=initargs) as pool:
+            return list(pool.map(play_word, words, chunksize=max(1, len(words) // (workers * 8))))
+    finally:
+        release(shared, unlink=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Computer-vs-computer evaluation over the whole deck.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--limit', type=int, default=0, help='only play the first N words of the deck')
+    parser.add_argument('--max-clues', type=int, default=MAX_CLUES, help='clues given before the computer gives up')
+    parser.add_argument('--nprobe', type=int, default=LOAD_NPROBE,
+                        help='IVF clusters searched per guess (0 keeps the value the index was built with)')
+    parser.add_argument('--online', action='store_true', help='fetch clues missing from the clue store from BabelNet')
+    parser.add_argument('--output', help='write the summary and per-word results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare against')
+    args = parser.parse_args()
+
+    with open("data/catchphrase_words.txt", encoding='utf8') as file:
+        deck = [w.strip() for w in file]
+    deck = deck[:args.limit or None]
+    start = time.time()
+    word_results = run(deck, args.workers, not args.online, args.max_clues, args.nprobe)
+    summary = summarize(word_results, time.time() - start)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf8') as file:
+            baseline = json.load(file)['summary']
+    for key, value in summary.items():
+        line = f'{key:<26} {value:>12.3f}' if isinstance(value, float) else f'{key:<26} {value:>12}'
+        if baseline and key in baseline:
+            line += f'   (was {baseline[key]:.3f})'
+        print(line)
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as file:
+            json.dump({'config': vars(args), 'time': time.time(), 'summary': summary,
+                       'words': [r._asdict() for r in word_results]}, file, indent=2)
@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+
+import argparse
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from random import randint
+from typing import List
+
+from ann_index import LOAD_NPROBE
+from game_engine import INSTRUCTIONS, GameResources, GameSession
+
+""" Multi-session game server.
+    Line-based TCP: connect with `nc localhost 7777` (or telnet), type clues and guesses, one per line.
+    Every connection gets its own GameSession, all sessions share one GameResources (and so one
+    embedding model), and the blocking parts of each turn run on an executor so a slow guess or
+    clue fetch never stalls the other players.
+"""
+
+
+class GameServer:
+    def __init__(self, resources: GameResources, executor: Executor) -> None:
+        self.resources = resources
+        self.executor = executor
+        self.sessions = 0
+
+    @staticmethod
+    async def send(writer: asyncio.StreamWriter, messages: List[str]) -> None:
+        writer.write(''.join(f'{m}\n' for m in messages).encode('utf8'))
+        await writer.drain()
+
+    async def play(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Runs one session for the lifetime of the connection"""
+        loop = asyncio.get_running_loop()
+        self.sessions += 1
+        try:
+            session = GameSession(self.resources, randint(60, 99))
+            await self.send(writer, ['Welcome to the Catch Phrase Simulation!', INSTRUCTIONS,
+                                     f'You have {session.total_time} seconds.'])
+            reply = await loop.run_in_executor(self.executor, session.start)
+            await self.send(writer, reply.messages)
+            while not session.over:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), timeout=session.input_time_left())
+                except asyncio.TimeoutError:
+                    line = b''
+                    if not session.out_of_time():
+                        continue
+                if not line and not session.out_of_time():
+                    break  # Client hung up
+                reply = await loop.run_in_executor(self.executor, session.handle, line.decode('utf8', 'replace'))
+                await self.send(writer, reply.messages)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host: str, port: int, reuse_port: bool = False) -> None:
+        """Accepts connections until cancelled. reuse_port lets several worker processes share the port."""
+        server = await asyncio.start_server(self.play, host, port, reuse_port=reuse_port or None)
+        print(f'Serving Catch Phrase on {host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Host many Catch Phrase games against one shared model.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--threads', type=int, default=8, help='executor threads for guesses and clue fetches')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes sharing one copy of the vectors (0 serves from this process)')
+    parser.add_argument('--nprobe', type=int, default=LOAD_NPROBE,
+                        help='IVF clusters searched per guess (0 keeps the value the index was built with)')
+    args = parser.parse_args()
+
+    if args.workers:
+        from workers import serve_workers
+        serve_workers(args.host, args.port, args.workers, args.threads, args.nprobe)
+    else:
+        game_server = GameServer(GameResources.load(nprobe=args.nprobe), ThreadPoolExecutor(args.threads))
+        try:
+            asyncio.run(game_server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+from typing import List
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # The modules read data/ relative to the repository
+
+from linguistics import inflection, use_rhyme_index  # noqa: E402
+from rhyme_index import RhymeIndex  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def rhymes() -> RhymeIndex:
+    """Built from cmudict for the test run, so data/rhymes.json is neither read nor written"""
+    index = RhymeIndex.build()
+    use_rhyme_index(index)
+    return index
+
+
+@pytest.fixture(scope='session')
+def deck() -> List[str]:
+    with open('data/catchphrase_words.txt', encoding='utf8') as file:
+        return [w.strip() for w in file]
+
+
+@pytest.fixture(scope='session')
+def vocabulary(deck: List[str], rhymes: RhymeIndex) -> List[str]:
+    """Lowercase words that trip every rule against the deck (plurals, rhymes, words around and inside
+    deck words) mixed with random cmudict words"""
+    rng = random.Random(0)
+    words = list(deck)
+    for target in deck:
+        words.append(inflection().plural(target))
+        words += [target + 's', target + 'er', 'over' + target, target[:-1], target[1:]]
+        rhyme_class = next(iter(rhymes.word_keys.get(target, ())), None)
+        if rhyme_class is not None:
+            members = list(rhymes.keys.values())[rhyme_class]
+            words += [rhymes.words[i] for i in rng.sample(members, min(5, len(members)))]
+    words += rng.sample([w for w in rhymes.words if w.isalpha()], 1500)
+    return list(dict.fromkeys(w for w in words if w))
@@ -0,0 +1,40 @@
+import random
+import re
+from typing import List
+
+from linguistics import Containment, bad_clue, convert_singular
+
+
+def regex_contains(word: str, clue: str) -> bool:
+    """The containment check bad_clue made before Containment, one regex per clue word"""
+    clue = re.sub('[()]', '', clue)
+    return bool(re.search(convert_singular(clue), word) or re.search(convert_singular(word), clue))
+
+
+def test_matches_the_regex_check(deck: List[str], vocabulary: List[str]) -> None:
+    """Plain words (no regex metacharacters), so both versions must agree on every clue list"""
+    rng = random.Random(3)
+    plain = [w for w in vocabulary if w.isalpha()]
+    for _ in range(5000):
+        word = rng.choice(deck)
+        clue_words = rng.sample(plain, rng.randint(1, 6))
+        assert Containment(word).matches(clue_words) == [regex_contains(word, c) for c in clue_words], \
+            (word, clue_words)
+
+
+def test_match_in_every_position(deck: List[str]) -> None:
+    """Hits in the first, middle and last clue word, and several in a row, are all reported"""
+    containment = Containment('apple')
+    assert containment.matches(['apples', 'pie', 'crabapple', 'app', 'applesauce']) == [True, False, True, True, True]
+    assert containment.matches([]) == []
+
+
+def test_metacharacters_are_literal() -> None:
+    """Player input isn't a pattern: these used to crash or act as wildcards"""
+    containment = Containment('apple')
+    assert containment.matches(['c++', '[x', '?', 'a.', '(apple)', 'a.ple']) == [False, False, False, False, True, False]
+    assert not bad_clue('apple', ['c++', '[x', 'a.ple'])
+
+
+def test_blank() -> None:
+    assert Containment('apple').blank('an apple a day; apples.') == 'an <blank> a day; <blank>s.'
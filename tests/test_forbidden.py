@@ -0,0 +1,50 @@
+import random
+from typing import List
+
+import numpy as np
+import pytest
+
+from forbidden import ForbiddenMasks
+from linguistics import bad_clue
+
+
+@pytest.fixture(scope='module')
+def targets(deck: List[str]) -> List[str]:
+    return random.Random(1).sample(deck, 40)
+
+
+@pytest.fixture(scope='module')
+def masks(targets: List[str], vocabulary: List[str]) -> ForbiddenMasks:
+    return ForbiddenMasks.build(targets, vocabulary)
+
+
+def test_mask_matches_bad_clue(targets: List[str], vocabulary: List[str], masks: ForbiddenMasks) -> None:
+    """Bit set for a word exactly when bad_clue rejects it as a clue for the target"""
+    for target in targets:
+        expected = [bool(bad_clue(target, [word])) for word in vocabulary]
+        mismatched = [w for w, bit, e in zip(vocabulary, masks.mask(target), expected) if bit != e]
+        assert not mismatched, (target, mismatched)
+
+
+def test_mask_matches_bad_clue_for_guesses(targets: List[str], vocabulary: List[str], masks: ForbiddenMasks) -> None:
+    """The other direction: a deck word given as a clue rules out exactly the guesses bad_clue rejects"""
+    for clue in targets:
+        expected = [bool(bad_clue(guess, [clue])) for guess in vocabulary]
+        mismatched = [w for w, bit, e in zip(vocabulary, masks.mask(clue), expected) if bit != e]
+        assert not mismatched, (clue, mismatched)
+
+
+def test_illegal_reads_the_same_bits(targets: List[str], vocabulary: List[str], masks: ForbiddenMasks) -> None:
+    indices = np.random.default_rng(2).integers(0, len(vocabulary), 500)
+    for target in targets:
+        assert (masks.illegal(target, indices) == masks.mask(target)[indices]).all()
+
+
+def test_save_and_load(tmp_path, targets: List[str], vocabulary: List[str], masks: ForbiddenMasks) -> None:
+    path = str(tmp_path / 'forbidden')
+    masks.save(path)
+    loaded = ForbiddenMasks.load(len(vocabulary), path)
+    for target in targets:
+        assert (loaded.mask(target) == masks.mask(target)).all()
+    with pytest.raises(ValueError):
+        ForbiddenMasks.load(len(vocabulary) + 8, path)
@@ -0,0 +1,77 @@
+import random
+from typing import List
+
+import numpy as np
+import pytest
+
+from candidate_index import CandidateIndex
+from forbidden import ForbiddenMasks
+from guess_engine import NO_GUESS, GuessEngine, GuessState
+from linguistics import bad_clue
+from vector_store import VectorStore
+
+
+def one_shot_guess(engine: GuessEngine, clue: List[str], already_guessed: List[str]) -> str:
+    """How guesses were made before GuessState: rank the whole clue from scratch, then skip old and illegal words"""
+    guessed = set(already_guessed)
+    for guess in engine.candidates(clue, excluded=already_guessed):
+        guess = guess.lower()
+        if guess not in guessed and not bad_clue(guess, clue):
+            return guess
+    return NO_GUESS
+
+
+@pytest.fixture(scope='module')
+def store(deck: List[str], vocabulary: List[str]) -> VectorStore:
+    """Seeded random vectors, with the words around and inside each deck word placed close to it so that
+    the best candidates are often illegal, plus other casings of a few words"""
+    index2word = vocabulary + ['Apple', 'APPLE', 'Cat', 'New_York']
+    rng = np.random.default_rng(4)
+    vectors = rng.standard_normal((len(index2word), 32)).astype(np.float32)
+    rows = {w: i for i, w in enumerate(index2word)}
+    for target in deck:
+        for word in (target + 's', target + 'er', 'over' + target, target[:-1], target.capitalize()):
+            if word in rows:
+                vectors[rows[word]] = vectors[rows[target]] + 0.3 * rng.standard_normal(32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return VectorStore(index2word, vectors)
+
+
+@pytest.fixture(scope='module', params=['exact', 'forbidden', 'candidates'])
+def engine(request, store: VectorStore, deck: List[str]) -> GuessEngine:
+    if request.param == 'forbidden':
+        return GuessEngine(store, forbidden=ForbiddenMasks.build(deck, store.index2word))
+    if request.param == 'candidates':
+        return GuessEngine(store, candidates=CandidateIndex.build(store, {'the', 'of'}, deck))
+    return GuessEngine(store)
+
+
+def test_incremental_matches_one_shot(engine: GuessEngine, deck: List[str], vocabulary: List[str]) -> None:
+    """Clues arriving one at a time give the same guesses as ranking every clue so far from scratch"""
+    rng = random.Random(5)
+    for _ in range(60):
+        state = GuessState(engine)
+        clue: List[str] = []
+        guessed: List[str] = []
+        for _ in range(4):
+            words = rng.sample(deck, rng.randint(0, 2)) + rng.sample(vocabulary, rng.randint(1, 2))
+            state.add_clue(words)
+            clue += words
+            guess = state.next_guess()
+            assert guess == one_shot_guess(engine, clue, guessed), (clue, guessed)
+            assert guess == engine.best_guess(clue, guessed)
+            guessed.append(guess)
+
+
+def test_no_guess_without_known_words(engine: GuessEngine) -> None:
+    state = GuessState(engine)
+    state.add_clue(['notaword'])
+    assert state.next_guess() == NO_GUESS
+
+
+def test_other_casings_are_excluded(engine: GuessEngine) -> None:
+    """A clue word rules out every casing of itself"""
+    state = GuessState(engine)
+    state.add_clue(['apple'])
+    for _ in range(20):
+        assert state.next_guess() not in ('apple', 'Apple', 'APPLE')
@@ -0,0 +1,145 @@
+#! /usr/bin/env python
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+""" Per-turn tracing.
+    Set CATCHPHRASE_TRACE=trace.jsonl to record a timing span for every stage of every turn (guess
+    ranking, clue validation, clue store lookups, BabelNet requests and parsing, sounds, redraws),
+    with counters such as candidates rejected per guess attached to the span they belong to.
+    `python tracing.py trace.jsonl [...]` prints p50/p95/p99 per stage across sessions.
+    When tracing is off, span() hands back a shared no-op object, so the hot paths pay one attribute check.
+"""
+
+TRACE_PATH = os.environ.get('CATCHPHRASE_TRACE', '')
+
+
+class NullSpan:
+    """Stand-in used while tracing is disabled"""
+
+    def __enter__(self) -> 'NullSpan':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def note(self, **fields) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, tracer: 'Tracer', stage: str) -> None:
+        self.tracer = tracer
+        self.stage = stage
+        self.fields: Dict[str, object] = {}
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.tracer.emit(dict(stage=self.stage, ms=(time.perf_counter() - self.start) * 1000, **self.fields))
+
+    def note(self, **fields) -> None:
+        """Attaches counters to the span, e.g. span.note(rejected=12)"""
+        self.fields.update(fields)
+
+
+class Tracer:
+    """Writes spans as JSON lines. Session and turn are tracked per thread, so server sessions don't mix."""
+
+    def __init__(self, path: str = '') -> None:
+        self.path = path
+        self.enabled = bool(path)
+        self.file = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.process_session = uuid.uuid4().hex[:12]
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, stage)
+
+    def bind(self, session: str, turn: int, kind: str) -> None:
+        """Attributes this thread's next spans to the given session and turn"""
+        if self.enabled:
+            self.local.context = {'session': session, 'turn': turn, 'kind': kind}
+
+    def begin_turn(self, kind: str) -> None:
+        """Starts the next turn of this process's own session (the single-player front ends)"""
+        if self.enabled:
+            context = getattr(self.local, 'context', None)
+            turn = context['turn'] + 1 if context and context['session'] == self.process_session else 1
+            self.bind(self.process_session, turn, kind)
+
+    def emit(self, record: Dict[str, object]) -> None:
+        context = getattr(self.local, 'context', None) or {'session': self.process_session, 'turn': None,
+                                                           'kind': threading.current_thread().name}
+        line = json.dumps(dict(ts=time.time(), **context, **record))
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf8')
+            self.file.write(line + '\n')
+            self.file.flush()
+
+
+tracer = Tracer(TRACE_PATH)
+
+
+def summarize(paths: List[str]) -> Tuple[int, Dict[str, Dict[str, float]]]:
+    """Aggregates span latencies (and the mean of any counters) per stage. Also returns the number of sessions."""
+    latencies: Dict[str, List[float]] = {}
+    counters: Dict[str, Dict[str, List[float]]] = {}
+    sessions = set()
+    for path in paths:
+        with open(path, encoding='utf8') as file:
+            for line in file:
+                record = json.loads(line)
+                stage = record['stage']
+                sessions.add(record['session'])
+                latencies.setdefault(stage, []).append(record['ms'])
+                for key, value in record.items():
+                    if key not in ('ts', 'session', 'turn', 'kind', 'stage', 'ms') and isinstance(value, (int, float)):
+                        counters.setdefault(stage, {}).setdefault(key, []).append(value)
+    summary = {}
+    for stage, samples in sorted(latencies.items()):
+        samples.sort()
+        summary[stage] = {
+            'count': len(samples),
+            'p50_ms': percentile(samples, 50),
+            'p95_ms': percentile(samples, 95),
+            'p99_ms': percentile(samples, 99),
+        }
+        for key, values in counters.get(stage, {}).items():
+            summary[stage][f'mean_{key}'] = sum(values) / len(values)
+    return len(sessions), summary
+
+
+def percentile(ordered: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered), max(1, math.ceil(p / 100 * len(ordered)))) - 1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize CATCHPHRASE_TRACE files per stage.')
+    parser.add_argument('paths', nargs='+', help='JSON-lines trace files')
+    args = parser.parse_args()
+
+    session_count, stages = summarize(args.paths)
+    print(f'{session_count} session(s)')
+    for stage, stats in stages.items():
+        extras = ' '.join(f'{k}={v:.1f}' for k, v in stats.items() if k.startswith('mean_'))
+        print(f'{stage:<20} n={stats["count"]:<6} p50={stats["p50_ms"]:8.2f}ms p95={stats["p95_ms"]:8.2f}ms '
+              f'p99={stats["p99_ms"]:8.2f}ms {extras}')
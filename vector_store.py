@@ -0,0 +1,152 @@
+#! /usr/bin/env python
+
+import argparse
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+""" Native embedding store.
+    The word2vec .bin.gz is gunzipped and parsed once by `python vector_store.py`, which writes
+    data/vectors.npy (row-normalized float32 matrix) and data/vectors.vocab (one word per line).
+    The game memory maps the .npy, so startup is near instant and the pages are shared through the
+    OS page cache by every game process on the host.
+    `python vector_store.py --quantize int8` (or float16) adds a compact copy of the matrix that is
+    scanned instead of the float32 one; only the shortlisted rows are then re-scored at full precision.
+"""
+
+WORD2VEC_PATH = 'data/GoogleNews-vectors-negative300.bin.gz'
+STORE_PATH = 'data/vectors'
+VOCAB_LIMIT = 200000
+QUANTIZATIONS = ('int8', 'float16')
+SCORE_CHUNK = 512  # rows dequantized at a time: the float32 block (600 KB at 300 dimensions) stays in L2
+
+
+class VectorStore:
+    """Vocabulary and unit-length vectors. Mirrors the parts of gensim's KeyedVectors the game uses."""
+
+    def __init__(self, index2word: List[str], vectors: np.ndarray, quantized: Optional[np.ndarray] = None,
+                 scales: Optional[np.ndarray] = None) -> None:
+        self.index2word = index2word
+        self.vocab: Dict[str, int] = {w: i for i, w in enumerate(index2word)}
+        self.vectors = vectors
+        self.quantized = quantized  # float16 or int8 copy of vectors used for scanning, if any
+        self.scales = scales  # per-row scales of an int8 copy
+
+    @classmethod
+    def from_keyed_vectors(cls, keyed_vectors) -> 'VectorStore':
+        """Builds a store from a loaded gensim model, normalizing every row"""
+        vectors = np.asarray(keyed_vectors.vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return cls(list(keyed_vectors.index2word), vectors / norms)
+
+    @classmethod
+    def load(cls, path: str = STORE_PATH) -> 'VectorStore':
+        """Opens a converted store. The matrix is memory mapped read-only, not read into the heap."""
+        vectors = np.load(path + '.npy', mmap_mode='r')
+        with open(path + '.vocab', encoding='utf8') as file:
+            index2word = [w.rstrip('\n') for w in file]
+        if len(index2word) != vectors.shape[0]:
+            raise ValueError(f'{path}.vocab has {len(index2word)} words but {path}.npy has {vectors.shape[0]} rows')
+        store = cls(index2word, vectors)
+        for kind in QUANTIZATIONS:
+            if os.path.exists(f'{path}.{kind}.npy'):
+                store.quantized = np.load(f'{path}.{kind}.npy', mmap_mode='r')
+                if store.quantized.shape != vectors.shape:
+                    raise ValueError(f'{path}.{kind}.npy is {store.quantized.shape} but {path}.npy is {vectors.shape}; '
+                                     f'rerun `python vector_store.py --quantize {kind}`')
+                if kind == 'int8':
+                    store.scales = np.load(f'{path}.int8.scales.npy')
+                    if store.scales.shape != (len(vectors),):
+                        raise ValueError(f'{path}.int8.scales.npy has {len(store.scales)} scales but {path}.npy has '
+                                         f'{len(vectors)} rows')
+                break
+        return store
+
+    def save(self, path: str = STORE_PATH) -> None:
+        """Writes the matrix and vocabulary in the format read by load(). A compact copy of an earlier matrix is deleted."""
+        remove_quantized(path)
+        np.save(path + '.npy', np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(path + '.vocab', 'w', encoding='utf8') as file:
+            file.writelines(w + '\n' for w in self.index2word)
+
+    def quantize(self, kind: str) -> None:
+        """Builds the compact copy: float16, or int8 with one scale per row"""
+        if kind == 'float16':
+            self.quantized, self.scales = np.asarray(self.vectors, dtype=np.float16), None
+        elif kind == 'int8':
+            self.quantized = np.empty(self.vectors.shape, dtype=np.int8)
+            self.scales = np.empty(len(self.vectors), dtype=np.float32)
+            for start in range(0, len(self.vectors), SCORE_CHUNK):
+                block = np.asarray(self.vectors[start:start + SCORE_CHUNK], dtype=np.float32)
+                scales = np.abs(block).max(axis=1) / 127
+                scales[scales == 0] = 1
+                self.quantized[start:start + SCORE_CHUNK] = np.round(block / scales[:, None])
+                self.scales[start:start + SCORE_CHUNK] = scales
+        else:
+            raise ValueError(f'Unknown quantization {kind!r}, expected one of {QUANTIZATIONS}')
+
+    def save_quantized(self, path: str = STORE_PATH) -> None:
+        kind = 'int8' if self.quantized.dtype == np.int8 else 'float16'
+        remove_quantized(path)
+        np.save(f'{path}.{kind}.npy', self.quantized)
+        if self.scales is not None:
+            np.save(f'{path}.int8.scales.npy', self.scales)
+
+    def approximate_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot products against the quantized copy (all rows, or just the given ones)"""
+        if rows is None:
+            return quantized_scores(self.quantized, self.scales, query)
+        return quantized_scores(self.quantized[rows], None if self.scales is None else self.scales[rows], query)
+
+
+def quantized_scores(quantized: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Dot products of a float16 or int8 (with per-row scales) matrix with the query, dequantized in chunks"""
+    scores = np.empty(len(quantized), dtype=np.float32)
+    for start in range(0, len(quantized), SCORE_CHUNK):
+        scores[start:start + SCORE_CHUNK] = np.asarray(quantized[start:start + SCORE_CHUNK], dtype=np.float32) @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+def remove_quantized(path: str = STORE_PATH) -> None:
+    """Deletes any compact copy (and int8 scales) stored next to the matrix"""
+    for kind in QUANTIZATIONS:
+        for suffix in ('.npy', '.scales.npy'):
+            if os.path.exists(f'{path}.{kind}{suffix}'):
+                os.remove(f'{path}.{kind}{suffix}')
+
+
+def load_model(path: str = STORE_PATH) -> VectorStore:
+    """Opens the converted store if it exists, otherwise falls back to parsing the word2vec file"""
+    if os.path.exists(path + '.npy'):
+        return VectorStore.load(path)
+    from gensim.models import KeyedVectors
+    keyed_vectors = KeyedVectors.load_word2vec_format(WORD2VEC_PATH, binary=True, limit=VOCAB_LIMIT)
+    return VectorStore.from_keyed_vectors(keyed_vectors)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the word2vec binary into a memory mappable store.')
+    parser.add_argument('--source', default=WORD2VEC_PATH, help='word2vec binary to convert')
+    parser.add_argument('--output', default=STORE_PATH, help='path prefix for the .npy and .vocab files')
+    parser.add_argument('--limit', type=int, default=VOCAB_LIMIT, help='number of most frequent words to keep (0 keeps all 3M)')
+    parser.add_argument('--quantize', choices=QUANTIZATIONS,
+                        help='also write a compact copy for scanning (reuses an existing converted store)')
+    args = parser.parse_args()
+
+    if args.quantize and os.path.exists(args.output + '.npy'):
+        remove_quantized(args.output)  # Replaced below, and it may not match the matrix any more
+        store = VectorStore.load(args.output)
+    else:
+        from gensim.models import KeyedVectors
+        print(f'Reading {args.source}...')
+        store = VectorStore.from_keyed_vectors(KeyedVectors.load_word2vec_format(args.source, binary=True, limit=args.limit or None))
+        store.save(args.output)
+        print(f'Wrote {len(store.index2word)} words to {args.output}.npy and {args.output}.vocab')
+    if args.quantize:
+        store.quantize(args.quantize)
+        store.save_quantized(args.output)
+        print(f'Wrote the {args.quantize} copy of {args.output}.npy')
@@ -0,0 +1,159 @@
+import asyncio
+import gc
+import multiprocessing
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ann_index import LOAD_NPROBE
+from clue_store import ClueStore
+from game_engine import GameResources
+from linguistics import rhyme_index
+from server import GameServer
+from vector_store import VectorStore, load_model
+
+""" Multi-process worker mode.
+    Where fork is available (Linux, macOS) the parent loads all of GameResources once (vectors, vocabulary
+    lookups, rhyme index, inflect and nltk) and forks the workers, which share those pages copy-on-write;
+    only the clue store's SQLite connection is reopened per worker. Elsewhere workers are spawned: a memory
+    mapped store is simply re-mapped by each worker (the OS page cache shares it), a heap matrix (the gensim
+    fallback) is copied once into a named shared memory block that the workers attach to without copying,
+    and the quantized copy and its scales are shared the same way; everything else is loaded per worker.
+    Every worker runs its own GameServer on the same port through SO_REUSEPORT, so the kernel spreads
+    connections across cores.
+"""
+
+
+class SharedMatrix(NamedTuple):
+    """Everything a worker needs to find the parent's vectors"""
+    name: Optional[str]  # shared memory block, or None when mmap_path is set
+    shape: Tuple[int, int]
+    dtype: str
+    mmap_path: Optional[str] = None
+
+
+def share_matrix(vectors: np.ndarray) -> Tuple[Optional[SharedMemory], SharedMatrix]:
+    """Publishes the matrix to other processes. The caller owns (and must unlink) the returned block."""
+    if isinstance(vectors, np.memmap) and vectors.filename:
+        return None, SharedMatrix(None, vectors.shape, vectors.dtype.str, vectors.filename)
+    block = SharedMemory(create=True, size=vectors.nbytes)
+    shared = np.ndarray(vectors.shape, dtype=vectors.dtype, buffer=block.buf)
+    shared[:] = vectors
+    return block, SharedMatrix(block.name, vectors.shape, vectors.dtype.str)
+
+
+def attach_matrix(handle: SharedMatrix) -> Tuple[Optional[SharedMemory], np.ndarray]:
+    """Zero-copy view of the parent's matrix. Keep the returned block alive as long as the view."""
+    if handle.mmap_path:
+        return None, np.load(handle.mmap_path, mmap_mode='r')
+    block = SharedMemory(name=handle.name)
+    vectors = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=block.buf)
+    vectors.flags.writeable = False
+    return block, vectors
+
+
+class SharedStore(NamedTuple):
+    """Everything a worker needs to rebuild the parent's VectorStore"""
+    index2word: List[str]
+    vectors: SharedMatrix
+    quantized: Optional[SharedMatrix] = None
+    scales: Optional[SharedMatrix] = None
+
+
+def share_store(store: VectorStore) -> Tuple[List[SharedMemory], SharedStore]:
+    """Publishes the store's matrix, and its quantized copy if it has one. The caller owns (and must unlink) the blocks."""
+    blocks = []
+    handles = []
+    for array in (store.vectors, store.quantized, store.scales):
+        if array is None:
+            handles.append(None)
+            continue
+        block, handle = share_matrix(array)
+        if block is not None:
+            blocks.append(block)
+        handles.append(handle)
+    return blocks, SharedStore(store.index2word, *handles)
+
+
+def attach_store(handle: SharedStore) -> Tuple[List[SharedMemory], VectorStore]:
+    """Zero-copy VectorStore over the parent's arrays. Keep the returned blocks alive as long as the store."""
+    blocks = []
+    arrays = []
+    for matrix in (handle.vectors, handle.quantized, handle.scales):
+        if matrix is None:
+            arrays.append(None)
+            continue
+        block, array = attach_matrix(matrix)
+        if block is not None:
+            blocks.append(block)
+        arrays.append(array)
+    return blocks, VectorStore(handle.index2word, *arrays)
+
+
+def release(blocks: List[SharedMemory], unlink: bool = False) -> None:
+    for block in blocks:
+        block.close()
+        if unlink:
+            block.unlink()
+
+
+def serve(resources: GameResources, host: str, port: int, threads: int) -> None:
+    game_server = GameServer(resources, ThreadPoolExecutor(threads))
+    try:
+        asyncio.run(game_server.serve(host, port, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+def worker_main(handle: SharedStore, host: str, port: int, threads: int, nprobe: int) -> None:
+    """Entry point of one spawned worker process: attaches to the vectors and loads everything else itself"""
+    blocks, store = attach_store(handle)
+    try:
+        serve(GameResources.load(store, nprobe), host, port, threads)
+    finally:
+        release(blocks)
+
+
+def forked_worker_main(resources: GameResources, host: str, port: int, threads: int) -> None:
+    """Entry point of one forked worker process: everything but the clue store is inherited from the parent"""
+    resources.clue_store = ClueStore(resources.clue_store.path)  # SQLite connections can't cross a fork
+    serve(resources, host, port, threads)
+
+
+def serve_workers(host: str, port: int, workers: int, threads: int, nprobe: int = LOAD_NPROBE) -> None:
+    """Loads the model once, then starts and supervises the worker processes"""
+    rhyme_index()  # Built (and saved) here on first use, rather than by every worker at once
+    model = load_model()
+    blocks: List[SharedMemory] = []
+    if 'fork' in multiprocessing.get_all_start_methods():
+        resources = GameResources.load(model, nprobe)
+        resources.clue_store.close()
+        gc.freeze()  # The collector would otherwise write to (and so copy) every inherited object
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=forked_worker_main, args=(resources, host, port, threads), daemon=True)
+                     for _ in range(workers)]
+        del resources
+    else:
+        blocks, handle = share_store(model)
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=worker_main, args=(handle, host, port, threads, nprobe), daemon=True)
+                     for _ in range(workers)]
+    del model
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        release(blocks, unlink=True)